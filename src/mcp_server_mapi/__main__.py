@@ -5,9 +5,19 @@ app = typer.Typer()
 
 @app.command()
 def version():
-    from mcp_server_mapi.server import version as server_version
-    import asyncio
-    print(asyncio.run(server_version()))
+    # Deliberately avoids importing the server (FastMCP, pydantic) and asyncio:
+    # a one-shot `mapi --version` only needs a blocking subprocess call.
+    import subprocess
+    from mcp_server_mapi.config import MAPI_BIN
+    try:
+        proc = subprocess.run([MAPI_BIN, "--version"], capture_output=True, timeout=10.0)
+        out = proc.stdout[:32_000].decode(errors="replace")
+        if proc.returncode != 0:
+            out += f"\n\n--- STDERR (exit code {proc.returncode}) ---\n"
+            out += proc.stderr[:2000].decode(errors="replace")
+    except Exception as e:
+        out = f"(error retrieving version) {e}"
+    print(f"server=MAPI Server; mapi_bin={MAPI_BIN}; mapi_version={out.strip()}")
 
 
 @app.command()
@@ -17,4 +27,4 @@ def mcp():
 
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
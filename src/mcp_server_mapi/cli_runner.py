@@ -1,7 +1,12 @@
 from __future__ import annotations
 import asyncio
-from typing import Sequence, Optional, Mapping
+from typing import Awaitable, Callable, Sequence, Optional, Mapping
 import os
+import signal
+
+_READ_CHUNK = 64 * 1024
+_STDERR_MAX_BYTES = 2000
+_TERMINATE_GRACE_S = 5.0
 
 
 class CLIRuntimeError(Exception):
@@ -10,6 +15,61 @@ class CLIRuntimeError(Exception):
         self.exit_code = exit_code
 
 
+async def _drain(
+    stream: asyncio.StreamReader,
+    buf: bytearray,
+    limit: int,
+    on_chunk: Optional[Callable[[bytes], Awaitable[None]]] = None,
+) -> bool:
+    """
+    Read `stream` to EOF into `buf`, keeping at most `limit` bytes.
+    Every chunk read is passed to `on_chunk`, including discarded ones.
+    Returns whether anything was discarded.
+    """
+    truncated = False
+    while chunk := await stream.read(_READ_CHUNK):
+        if on_chunk is not None:
+            await on_chunk(chunk)
+        room = limit - len(buf)
+        if room > 0:
+            buf += chunk[:room]
+        if len(chunk) > room:
+            truncated = True
+    return truncated
+
+
+async def _stop(proc: asyncio.subprocess.Process) -> None:
+    """
+    Terminate `proc` and its process group, escalating to SIGKILL if it
+    ignores SIGTERM. Signalling the group also reaps grandchildren that
+    would otherwise keep the output pipes open.
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            async with asyncio.timeout(_TERMINATE_GRACE_S):
+                await proc.wait()
+            return
+        except TimeoutError:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+async def _feed(stream: asyncio.StreamWriter | None, data: Optional[bytes]) -> None:
+    if stream is None:
+        return
+    try:
+        if data:
+            stream.write(data)
+            await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stream.close()
+
+
 async def run_cli(
     base_cmd: Sequence[str],
     *,
@@ -17,10 +77,17 @@ async def run_cli(
     max_bytes: int = 256_000,
     stdin_data: Optional[bytes] = None,
     extra_env: Optional[Mapping[str, str]] = None,
+    on_output: Optional[Callable[[bytes], Awaitable[None]]] = None,
 ) -> str:
     """
     Run a command asynchronously with timeouts and bounded output.
-    Returns stdout as text; if non-zero exit, raises CLIRuntimeError with a short stderr snippet.
+    Output is drained incrementally, so memory stays bounded by `max_bytes`
+    no matter how much the command prints.
+    Returns stdout as text; on non-zero exit a short stderr snippet is appended.
+    On timeout the process is terminated (then killed) and CLIRuntimeError
+    is raised carrying whatever output was captured so far; on cancellation
+    or any other error the process is stopped before the error propagates.
+    If given, `on_output` is awaited with each raw stdout chunk as it arrives.
     """
     env = os.environ.copy()
     if extra_env:
@@ -32,19 +99,44 @@ async def run_cli(
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
         env=env,
+        start_new_session=True,
     )
+
+    stdout = bytearray()
+    stderr = bytearray()
+    tasks = [
+        asyncio.create_task(_drain(proc.stdout, stdout, max_bytes, on_output)),
+        asyncio.create_task(_drain(proc.stderr, stderr, _STDERR_MAX_BYTES)),
+        asyncio.create_task(_feed(proc.stdin, stdin_data)),
+    ]
     try:
-        stdout, stderr = await asyncio.wait_for(proc.communicate(stdin_data), timeout=timeout_s)
-    except asyncio.TimeoutError:
-        proc.kill()
-        raise CLIRuntimeError(f"Command timed out after {timeout_s}s")
+        try:
+            async with asyncio.timeout(timeout_s):
+                truncated, _, _ = await asyncio.gather(*tasks)
+                await proc.wait()
+        finally:
+            # gather() leaves the siblings running when one of them fails
+            for task in tasks:
+                task.cancel()
+    except TimeoutError:
+        await asyncio.shield(_stop(proc))
+        msg = f"Command timed out after {timeout_s}s"
+        if stdout:
+            msg += f"\n\n--- partial output ---\n{stdout.decode(errors='replace')}"
+        raise CLIRuntimeError(msg, exit_code=proc.returncode) from None
+    except BaseException:
+        # Cancellation or a failing callback: the child runs in its own
+        # session, so nothing else will stop it.
+        if proc.returncode is None:
+            await asyncio.shield(_stop(proc))
+        raise
 
     rc = proc.returncode
-    out = ""
-    out += (stdout or b"").decode(errors="replace")
-    if len(out.encode()) > max_bytes:
-        out = out.encode()[:max_bytes].decode(errors="replace") + "\n[truncated]"
+    out = stdout.decode(errors="replace")
+    if truncated:
+        out += "\n[truncated]"
     if rc != 0:
         out += f"\n\n--- STDERR (exit code {rc}) ---\n"
-        out += (stderr or b"").decode(errors="replace")[:2000]
+        out += stderr.decode(errors="replace")
     return out
+
@@ -0,0 +1,3 @@
+import os
+
+MAPI_BIN = os.environ.get("MAPI_BIN", "/usr/local/bin/mapi")  # override in env if needed
@@ -1,14 +1,18 @@
-from __future__ import annotations
 from pathlib import Path
 import asyncio
 import os
 import re
+import shlex
+import shutil
 import sys
+import time
+import weakref
 import logging
-from typing import Literal, List, Optional
+from typing import Awaitable, Callable, Literal, List, Optional
 
+import anyio
 from pydantic import BaseModel, Field, model_validator, field_validator
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
 # --- Logging: IMPORTANT ---
 # Never write to stdout on stdio servers (keeps JSON-RPC clean).
@@ -20,10 +24,14 @@ logging.basicConfig(
 log = logging.getLogger("mcp_server_mapi")
 
 from .cli_runner import run_cli, CLIRuntimeError
+from .config import MAPI_BIN
 
-MAPI_BIN = os.environ.get("MAPI_BIN", "/usr/local/bin/mapi")  # override in env if needed
 mcp = FastMCP("MAPI Server")
 
+_DISCOVER_TIMEOUT_S = 600.0
+_PROGRESS_INTERVAL_S = 1.0
+_PROGRESS_LINE_MAX = 4096
+
 
 # -----------------------------
 # Pydantic schema for `mapi discover`
@@ -116,6 +124,40 @@ def _comma_join(values: List[str | int]) -> str:
     return ",".join(str(v) for v in values)
 
 
+def _progress_reporter(ctx: Context, total: float | None) -> Callable[[bytes], Awaitable[None]]:
+    """
+    Forward mapi output to the client as progress notifications (elapsed seconds),
+    at most one per _PROGRESS_INTERVAL_S carrying the latest complete output line.
+    An unfinished line is kept until its newline arrives in a later chunk (only
+    its last _PROGRESS_LINE_MAX bytes, so a never-terminated line stays bounded).
+    Progress is best-effort: a closed client stream never aborts the run.
+    """
+    start = time.monotonic()
+    last_sent = float("-inf")
+    latest_line: str | None = None
+    pending = b""
+
+    async def _report(chunk: bytes) -> None:
+        nonlocal last_sent, latest_line, pending
+        complete, newline, pending = (pending + chunk).rpartition(b"\n")
+        pending = pending[-_PROGRESS_LINE_MAX:]
+        if newline:
+            line = complete.rstrip().rpartition(b"\n")[2]
+            if line:
+                latest_line = line.decode(errors="replace")
+        now = time.monotonic()
+        if now - last_sent < _PROGRESS_INTERVAL_S:
+            return
+        last_sent = now
+        try:
+            await ctx.report_progress(now - start, total, latest_line)
+        except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+            # The client went away; the run itself should still finish.
+            log.debug("Failed to send progress notification", exc_info=True)
+
+    return _report
+
+
 _DURATION_RE = re.compile(r"(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?$")
 
 
@@ -143,7 +185,7 @@ def parse_duration(raw: str) -> float:
 
     """
 )
-async def mapi_discover(args: DiscoverArgs) -> str:
+async def mapi_discover(args: DiscoverArgs, ctx: Context) -> str:
     cmd: list[str] = [MAPI_BIN, "discover"]
 
     # FLAGS
@@ -211,9 +253,15 @@ async def mapi_discover(args: DiscoverArgs) -> str:
     _add_repeat(cmd, "--oauth2-password-scopes", args.oauth2_password_scopes)
 
     # Run it
-    log.info("Running: %s", " ".join(cmd))
+    if log.isEnabledFor(logging.INFO):
+        log.info("Running: %s", shlex.join(cmd))
     try:
-        return await run_cli(cmd, timeout_s=600.0)
+        return await run_cli(
+            cmd,
+            timeout_s=_DISCOVER_TIMEOUT_S,
+            # The timeout is only a kill deadline, not an expected duration.
+            on_output=_progress_reporter(ctx, None),
+        )
     except CLIRuntimeError as e:  # only raised on timeout, not non-zero exit
         raise RuntimeError(str(e)) from None
 
@@ -365,7 +413,7 @@ class RunArgs(BaseModel):
     report at the end.
     """
 )
-async def mapi_run(args: RunArgs) -> str:
+async def mapi_run(args: RunArgs, ctx: Context) -> str:
     cmd: list[str] = [MAPI_BIN, "run"]
 
     # first, the required positionals:
@@ -470,9 +518,14 @@ async def mapi_run(args: RunArgs) -> str:
     _add_opt(cmd, "--p12cert", args.p12cert)
     _add_opt(cmd, "--p12password", args.p12password)
 
-    log.info("Running: %s", " ".join(cmd))
+    if log.isEnabledFor(logging.INFO):
+        log.info("Running: %s", shlex.join(cmd))
     try:
-        return await run_cli(cmd, timeout_s=args.process_timeout)
+        return await run_cli(
+            cmd,
+            timeout_s=args.process_timeout,
+            on_output=_progress_reporter(ctx, args.process_timeout),
+        )
     except CLIRuntimeError as e:  # only raised on timeout, not non-zero exit
         raise RuntimeError(str(e)) from None
 
@@ -494,9 +547,10 @@ async def bash(command: str, cwd: str | None = None) -> str:
         )
 
         try:
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=60)
+            async with asyncio.timeout(60):
+                stdout, stderr = await proc.communicate()
             exit_code = proc.returncode or 0
-        except asyncio.TimeoutError:
+        except TimeoutError:
             proc.kill()
             await proc.wait()
             return "Error: Command timed out after 1 minute"
@@ -513,8 +567,41 @@ async def bash(command: str, cwd: str | None = None) -> str:
         return f"Error executing command: {str(e)}"
 
 
+def _read_file(file_path: str, line_start: int | None, line_end: int | None) -> str:
+    """Synchronous body of read_file; runs in a worker thread."""
+    path = Path(file_path)
+    if not path.exists():
+        return f"Error: File not found at {file_path}"
+
+    if not path.is_file():
+        return f"Error: {file_path} is not a file"
+
+    content = path.read_text()
+
+    if line_start is not None or line_end is not None:
+        lines = content.splitlines()
+        start_idx = (line_start - 1) if line_start else 0
+        end_idx = line_end if line_end else len(lines)
+
+        if start_idx < 0 or start_idx >= len(lines):
+            return f"Error: Starting line {line_start} is out of range (file has {len(lines)} lines)"
+
+        if end_idx < start_idx:
+            return f"Error: End line {line_end} cannot be before start line {line_start}"
+
+        selected_lines = lines[start_idx:end_idx]
+        return "\n".join(
+            f"{i + start_idx + 1:4d}→{line}"
+            for i, line in enumerate(selected_lines)
+        )
+
+    # Return full file with line numbers
+    lines = content.splitlines()
+    return "\n".join(f"{i + 1:4d}→{line}" for i, line in enumerate(lines))
+
+
 @mcp.tool(description="Read contents of a file on the MAPI server host, optionally specifying line range.")
-def read_file(
+async def read_file(
     file_path: str, line_start: int | None = None, line_end: int | None = None
 ) -> str:
     """Read contents of a file, optionally specifying line range.
@@ -525,42 +612,56 @@ def read_file(
         line_end: Ending line number (1-based, optional)
     """
     try:
-        path = Path(file_path)
-        if not path.exists():
-            return f"Error: File not found at {file_path}"
+        return await asyncio.to_thread(_read_file, file_path, line_start, line_end)
 
-        if not path.is_file():
-            return f"Error: {file_path} is not a file"
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
 
-        content = path.read_text()
 
-        if line_start is not None or line_end is not None:
-            lines = content.splitlines()
-            start_idx = (line_start - 1) if line_start else 0
-            end_idx = line_end if line_end else len(lines)
+def _edit_file(file_path: str, old_text: str, new_text: str, replace_all: bool) -> str:
+    """Synchronous read/replace/write for edit_file; runs in a worker thread."""
+    path = Path(file_path)
+    if not path.exists():
+        return f"Error: File not found at {file_path}"
 
-            if start_idx < 0 or start_idx >= len(lines):
-                return f"Error: Starting line {line_start} is out of range (file has {len(lines)} lines)"
+    if not path.is_file():
+        return f"Error: {file_path} is not a file"
 
-            if end_idx < start_idx:
-                return f"Error: End line {line_end} cannot be before start line {line_start}"
+    # Read current content
+    content = path.read_text()
 
-            selected_lines = lines[start_idx:end_idx]
-            return "\n".join(
-                f"{i + start_idx + 1:4d}→{line}"
-                for i, line in enumerate(selected_lines)
-            )
+    # Check if old_text exists
+    if old_text not in content:
+        return f"Error: Text to replace not found in {file_path}. Please read the file first to verify the exact text to replace."
 
-        # Return full file with line numbers
-        lines = content.splitlines()
-        return "\n".join(f"{i + 1:4d}→{line}" for i, line in enumerate(lines))
+    # Count occurrences for informative output
+    occurrence_count = content.count(old_text)
 
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
+    # Perform replacement
+    if replace_all:
+        new_content = content.replace(old_text, new_text)
+        replaced_count = occurrence_count
+    else:
+        new_content = content.replace(old_text, new_text, 1)
+        replaced_count = 1
+
+    # Validate that content actually changed
+    if new_content == content:
+        return f"Warning: No changes made to {file_path} (old_text and new_text are identical)"
+
+    # Write the updated content
+    path.write_text(new_content)
+
+    return f"Successfully replaced {replaced_count} occurrence(s) of text in {file_path} (found {occurrence_count} total occurrences)"
+
+
+# Serializes concurrent edit_file calls on the same file so no edit is lost.
+# Weak values: a lock disappears once no edit of that file holds or awaits it.
+_edit_locks: weakref.WeakValueDictionary[Path, asyncio.Lock] = weakref.WeakValueDictionary()
 
 
 @mcp.tool(description="Edit a file on the MAPI server host with find-and-replace operations.")
-def edit_file(
+async def edit_file(
     file_path: str, old_text: str, new_text: str, replace_all: bool = False
 ) -> str:
     """Edit a file with find-and-replace operations.
@@ -575,55 +676,22 @@ def edit_file(
         replace_all: If True, replace all occurrences; if False, replace only first occurrence
     """
     try:
-        path = Path(file_path)
-        if not path.exists():
-            return f"Error: File not found at {file_path}"
-
-        if not path.is_file():
-            return f"Error: {file_path} is not a file"
-
-        # Read current content
-        content = path.read_text()
-
-        # Check if old_text exists
-        if old_text not in content:
-            return f"Error: Text to replace not found in {file_path}. Please read the file first to verify the exact text to replace."
-
-        # Count occurrences for informative output
-        occurrence_count = content.count(old_text)
-
-        # Perform replacement
-        if replace_all:
-            new_content = content.replace(old_text, new_text)
-            replaced_count = occurrence_count
-        else:
-            new_content = content.replace(old_text, new_text, 1)
-            replaced_count = 1
-
-        # Validate that content actually changed
-        if new_content == content:
-            return f"Warning: No changes made to {file_path} (old_text and new_text are identical)"
-
-        # Write the updated content
-        path.write_text(new_content)
-
-        return f"Successfully replaced {replaced_count} occurrence(s) of text in {file_path} (found {occurrence_count} total occurrences)"
+        key = await asyncio.to_thread(Path(file_path).resolve)
+        lock = _edit_locks.get(key)
+        if lock is None:
+            lock = _edit_locks[key] = asyncio.Lock()
+        async with lock:
+            return await asyncio.to_thread(_edit_file, file_path, old_text, new_text, replace_all)
 
     except Exception as e:
         return f"Error editing file: {str(e)}"
 
 
-async def version() -> str:
-    try:
-        out = await run_cli([MAPI_BIN, "--version"], timeout_s=10.0, max_bytes=32_000)
-    except Exception as e:
-        out = f"(error retrieving version) {e}"
-    return f"server=MAPI Server; mapi_bin={MAPI_BIN}; mapi_version={out.strip()}"
-
-
 def main():
     if os.environ.get("MAYHEM_TOKEN") is None:
         log.error("MAYHEM_TOKEN not set; cannot start MAPI server")
         sys.exit(1)
+    if shutil.which(MAPI_BIN) is None:
+        log.warning("mapi binary not found or not executable at %s; set MAPI_BIN", MAPI_BIN)
     log.info("Starting MAPI Server on stdio...")
     mcp.run(transport="stdio")
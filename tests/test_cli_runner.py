@@ -0,0 +1,94 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+from mcp_server_mapi import cli_runner
+from mcp_server_mapi.cli_runner import CLIRuntimeError, run_cli
+
+
+def _group_alive(pgid: int) -> bool:
+    """True if any non-zombie process is still in process group `pgid`."""
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # pid (comm) state ppid pgrp ...; comm may contain spaces
+                fields = f.read().rpartition(")")[2].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid and fields[0] != "Z":
+            return True
+    return False
+
+
+@unittest.skipUnless(os.path.isdir("/proc"), "needs /proc to inspect process groups")
+class RunCliTest(unittest.IsolatedAsyncioTestCase):
+    async def assertGroupGone(self, pgid: int):
+        for _ in range(50):
+            if not _group_alive(pgid):
+                return
+            await asyncio.sleep(0.1)
+        self.fail(f"process group {pgid} still has live processes")
+
+    async def test_returns_stdout(self):
+        self.assertEqual(await run_cli(["sh", "-c", "echo hi"]), "hi\n")
+
+    async def test_feeds_stdin(self):
+        self.assertEqual(await run_cli(["cat"], stdin_data=b"abc"), "abc")
+
+    async def test_truncates_output(self):
+        out = await run_cli(["sh", "-c", "yes | head -c 1000000"], max_bytes=10)
+        self.assertEqual(out, "y\ny\ny\ny\ny\n\n[truncated]")
+
+    async def test_nonzero_exit_appends_stderr(self):
+        out = await run_cli(["sh", "-c", "echo out; echo err >&2; exit 3"])
+        self.assertEqual(out, "out\n\n\n--- STDERR (exit code 3) ---\nerr\n")
+
+    async def test_missing_binary(self):
+        with self.assertRaises(FileNotFoundError):
+            await run_cli(["/nonexistent/mapi"])
+
+    async def test_timeout_kills_group_ignoring_sigterm(self):
+        # The shell ignores SIGTERM and a grandchild holds the pipes open.
+        cmd = ["sh", "-c", "trap '' TERM; echo $$; sleep 30 & wait"]
+        with mock.patch.object(cli_runner, "_TERMINATE_GRACE_S", 0.5):
+            with self.assertRaises(CLIRuntimeError) as cm:
+                await run_cli(cmd, timeout_s=0.5)
+        msg = str(cm.exception)
+        self.assertIn("timed out after 0.5s", msg)
+        self.assertIn("--- partial output ---", msg)
+        self.assertEqual(cm.exception.exit_code, -9)
+        await self.assertGroupGone(int(msg.rsplit("\n", 2)[-2]))
+
+    async def test_cancel_stops_group(self):
+        started = asyncio.get_running_loop().create_future()
+
+        async def on_output(chunk: bytes):
+            if not started.done():
+                started.set_result(int(chunk.split()[0]))
+
+        task = asyncio.create_task(
+            run_cli(["sh", "-c", "echo $$; sleep 30 & wait"], timeout_s=60, on_output=on_output)
+        )
+        pgid = await started
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await self.assertGroupGone(pgid)
+
+    async def test_failing_callback_stops_group(self):
+        pids = []
+
+        async def on_output(chunk: bytes):
+            pids.append(int(chunk.split()[0]))
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            await run_cli(["sh", "-c", "echo $$; sleep 30 & wait"], timeout_s=60, on_output=on_output)
+        await self.assertGroupGone(pids[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import gc
+import tempfile
+import unittest
+from pathlib import Path
+
+from mcp_server_mapi import server
+
+
+class FileToolsTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    async def test_concurrent_edits_are_not_lost(self):
+        path = self.dir / "report.txt"
+        path.write_text("".join(f"line{i}\n" for i in range(200)) * 100)
+
+        results = await asyncio.gather(
+            *(server.edit_file(str(path), f"line{i}\n", f"LINE{i}\n", replace_all=True) for i in range(200))
+        )
+
+        self.assertTrue(all(r.startswith("Successfully replaced 100 ") for r in results), results)
+        self.assertNotIn("line", path.read_text())
+        gc.collect()
+        self.assertEqual(len(server._edit_locks), 0)
+
+    async def test_edit_file_errors(self):
+        missing = self.dir / "missing.txt"
+        self.assertEqual(await server.edit_file(str(missing), "a", "b"), f"Error: File not found at {missing}")
+        self.assertEqual(await server.edit_file(str(self.dir), "a", "b"), f"Error: {self.dir} is not a file")
+
+    async def test_read_file(self):
+        path = self.dir / "spec.txt"
+        path.write_text("a\nb\nc\n")
+        self.assertEqual(await server.read_file(str(path)), "   1→a\n   2→b\n   3→c")
+        self.assertEqual(await server.read_file(str(path), line_start=2, line_end=3), "   2→b\n   3→c")
+        self.assertEqual(
+            await server.read_file(str(path), line_start=5),
+            "Error: Starting line 5 is out of range (file has 3 lines)",
+        )
+        self.assertEqual(await server.read_file(str(self.dir)), f"Error: {self.dir} is not a file")
+
+
+if __name__ == "__main__":
+    unittest.main()